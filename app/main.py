@@ -5,7 +5,8 @@ from pinecone import (Pinecone, ServerlessSpec,CloudProvider,AwsRegion,VectorTyp
 from dotenv import load_dotenv
 import torch
 from prepare_data import prepare_data
-from utils.embedding import query
+from utils.embedding import query, warm_caches
+from utils.hot_reload import ReloadableIndex
 load_dotenv()
 
 #Vector db pinecone setup
@@ -28,8 +29,21 @@ index = pc.Index(index_name)
 index.describe_index_stats()
 prepare_data(index)
 
-input = input("Please Enter your query\n")
-query(input, index)
+# With RAG_HOT_RELOAD=1, serve from an in-memory index that picks up new ingestions
+# (a newer saved/manifest.json generation) in the background, without a restart
+search_index = index
+if os.environ.get("RAG_HOT_RELOAD") == "1":
+    search_index = ReloadableIndex(poll_interval=float(os.environ.get("RAG_RELOAD_INTERVAL", "5"))).start()
+
+# Pre-warm query caches from a captured query log (e.g. yesterday's traffic)
+if os.environ.get("RAG_WARM_FROM"):
+    warm_caches(os.environ["RAG_WARM_FROM"], search_index)
+
+while True:
+    user_query = input("Please Enter your query (empty to quit)\n").strip()
+    if not user_query:
+        break
+    query(user_query, search_index)
 # Base LM ? 
 # Hugging face token
 # break document into chunks/convert into embeddings and store in a vector db. 
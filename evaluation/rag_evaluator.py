@@ -4,20 +4,42 @@ Evaluates retrieval quality, generation quality, and end-to-end performance
 """
 
 import json
+import hashlib
+import re
 import numpy as np
 from typing import List, Dict, Tuple
 import os
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import sys
 sys.path.append('..')
-from utils.embedding import query, generate_response, embedder, groq_client
+from utils.embedding import query, generate_response, embedder, groq_client, retrieve
+from utils.profiling import profile, stage
 import time
 
+JUDGE_MODEL = "llama3-8b-8192"
+JUDGE_CRITERIA = ("relevance", "accuracy", "completeness", "clarity")
+
 class RAGEvaluator:
-    def __init__(self):
-        self.embedder = embedder
+    def __init__(self, judge_cache_path: str = "evaluation/judge_cache.json",
+                 embeddings_path: str = "saved/embeddings.npy",
+                 encoder: SentenceTransformer = None, namespace: str = "rag-proj"):
+        # encoder/namespace let index variants built with other models be evaluated (see run_sweep.py)
+        self.embedder = encoder or embedder
+        self.namespace = namespace
         self.results = []
+        # Stored chunk vectors (row i is vector doc-i), memory-mapped so it is only read on use
+        self.chunk_embeddings = None
+        if embeddings_path and os.path.exists(embeddings_path):
+            self.chunk_embeddings = np.load(embeddings_path, mmap_mode='r')
+        self.chunk_store_verified = False  # set per index in run_full_evaluation
+        self.judge_cache_path = judge_cache_path
+        self.judge_cache = {}
+        if judge_cache_path and os.path.exists(judge_cache_path):
+            try:
+                with open(judge_cache_path, 'r') as f:
+                    self.judge_cache = json.load(f)
+            except json.JSONDecodeError:
+                print(f"⚠️  Ignoring corrupt judge cache {judge_cache_path}, starting empty")
         
     def load_test_questions(self, filepath: str) -> List[Dict]:
         """Load test questions from JSON file"""
@@ -33,10 +55,12 @@ class RAGEvaluator:
         - Average similarity score
         """
         retrieved_sources = [doc.metadata.get('source', '') for doc in retrieved_docs]
+        # Deduplicated chunks carry every document they appeared in
+        all_sources = [doc.metadata.get('sources') or [doc.metadata.get('source', '')] for doc in retrieved_docs]
         
         # Precision@K (how many retrieved are actually relevant)
-        relevant_retrieved = sum(1 for source in retrieved_sources 
-                               if any(rel_source in source for rel_source in relevant_sources))
+        relevant_retrieved = sum(1 for sources in all_sources
+                               if any(rel_source in source for source in sources for rel_source in relevant_sources))
         precision_at_k = relevant_retrieved / len(retrieved_docs) if retrieved_docs else 0
         
         # Calculate average similarity scores
@@ -50,30 +74,90 @@ class RAGEvaluator:
             'num_retrieved': len(retrieved_docs)
         }
     
-    def evaluate_answer_relevance(self, question: str, answer: str) -> float:
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        """Split an answer into sentences / bullet lines"""
+        parts = re.split(r'(?<=[.!?])\s+|\n+', text)
+        return [p.strip() for p in parts if len(p.strip()) > 3]
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def verify_chunk_store(self, index) -> bool:
         """
-        Evaluate how relevant the answer is to the question using semantic similarity
+        Whether saved/embeddings.npy (row i = doc-i) describes `index`: the namespace must
+        hold exactly as many vectors. Otherwise (another index, a stale ingestion) the
+        stored rows could belong to different chunks and must not be used.
         """
-        question_embedding = self.embedder.encode(question)
-        answer_embedding = self.embedder.encode(answer)
-        
-        similarity = cosine_similarity([question_embedding], [answer_embedding])[0][0]
-        return float(similarity)
-    
-    def evaluate_faithfulness(self, answer: str, context: str) -> float:
+        if self.chunk_embeddings is None:
+            return False
+        try:
+            stats = index.describe_index_stats()
+            namespaces = stats['namespaces'] if isinstance(stats, dict) else stats.namespaces
+            ns = namespaces.get(self.namespace)
+            count = ns['vector_count'] if isinstance(ns, dict) else getattr(ns, 'vector_count', None)
+        except Exception:
+            return False
+        return count == len(self.chunk_embeddings)
+
+    def get_chunk_vectors(self, matches: List) -> np.ndarray:
         """
-        Evaluate how faithful the answer is to the retrieved context
-        Simple implementation using semantic similarity
+        Vectors for retrieved chunks: the values returned with each match (retrieval asks for
+        them), else saved/embeddings.npy by ID if it was verified against the index.
+        Anything left is encoded (one batch, each chunk separately).
         """
-        if not context.strip():
-            return 0.0
-            
-        answer_embedding = self.embedder.encode(answer)
-        context_embedding = self.embedder.encode(context)
-        
-        similarity = cosine_similarity([answer_embedding], [context_embedding])[0][0]
-        return float(similarity)
-    
+        vectors = [None] * len(matches)
+        missing = []
+        for i, match in enumerate(matches):
+            values = getattr(match, 'values', None)
+            row = match.id[len('doc-'):] if match.id.startswith('doc-') else ''
+            if values:
+                vectors[i] = np.asarray(values, dtype=np.float32)
+            elif self.chunk_store_verified and row.isdigit() and int(row) < len(self.chunk_embeddings):
+                vectors[i] = np.asarray(self.chunk_embeddings[int(row)], dtype=np.float32)
+            else:
+                missing.append(i)
+        if missing:
+            encoded = self.embedder.encode([matches[i].metadata.get('text', '') for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return self._normalize(vectors)
+
+    def evaluate_generation(self, question_embedding, answer: str, matches: List) -> Dict:
+        """
+        Answer relevance, context relevance and faithfulness from one encode call.
+        The question vector comes from retrieval and chunk vectors from the index store;
+        only the answer and its sentences are encoded. Each sentence's support score is
+        its best cosine match over all context chunks (one similarity matrix).
+        """
+        sentences = self.split_sentences(answer) or [answer]
+        encoded = self._normalize(self.embedder.encode([answer] + sentences))
+        answer_vector, sentence_vectors = encoded[0], encoded[1:]
+        question_vector = self._normalize(question_embedding)
+
+        answer_relevance = float(answer_vector @ question_vector)
+        if not matches:
+            return {
+                'answer_relevance': answer_relevance,
+                'context_relevance': 0.0,
+                'faithfulness': 0.0,
+                'sentence_support': [{'sentence': s, 'support': 0.0} for s in sentences]
+            }
+
+        context_vectors = self.get_chunk_vectors(matches)
+        support = (sentence_vectors @ context_vectors.T).max(axis=1)
+        return {
+            'answer_relevance': answer_relevance,
+            'context_relevance': float(np.mean(context_vectors @ question_vector)),
+            'faithfulness': float(np.mean(support)),
+            'sentence_support': [
+                {'sentence': s, 'support': float(score)} for s, score in zip(sentences, support)
+            ]
+        }
+
     def evaluate_with_llm_judge(self, question: str, answer: str, context: str) -> Dict:
         """
         Use LLM as a judge to evaluate answer quality
@@ -120,8 +204,122 @@ Respond in JSON format:
         except Exception as e:
             return {"error": f"LLM evaluation failed: {str(e)}"}
     
-    def run_single_evaluation(self, question_data: Dict, index) -> Dict:
-        """Run evaluation for a single question"""
+    @staticmethod
+    def judge_cache_key(question: str, answer: str, context: str) -> str:
+        """Hash of everything the judge sees, so unchanged answers are never re-judged"""
+        payload = json.dumps([JUDGE_MODEL, question, answer, context[:1000]])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def validate_judge_verdict(verdict) -> bool:
+        """Check a single verdict against the judge output schema"""
+        if not isinstance(verdict, dict):
+            return False
+        for criterion in JUDGE_CRITERIA:
+            score = verdict.get(criterion)
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not 1 <= score <= 5:
+                return False
+        return isinstance(verdict.get('explanation', ''), str)
+
+    def _judge_batch_request(self, items: List[Dict]) -> Dict[str, Dict]:
+        """Send one judge request for several items, returning the valid verdicts by item id"""
+        blocks = "\n\n".join(
+            f"### Item {item['id']}\nQuestion: {item['question']}\nAnswer: {item['answer']}\nContext: {item['context'][:1000]}..."
+            for item in items
+        )
+        judge_prompt = f"""
+You are an expert evaluator. Evaluate each of the following Q&A items based on its own context.
+
+Rate every answer on a scale of 1-5 for each criterion:
+1. Relevance: How well does the answer address the question?
+2. Accuracy: Is the answer factually correct based on the context?
+3. Completeness: Does the answer fully address the question?
+4. Clarity: Is the answer clear and well-structured?
+
+{blocks}
+
+Respond with a single JSON object and nothing else, with one entry per item:
+{{"results": [{{"id": "<item id>", "relevance": <1-5>, "accuracy": <1-5>, "completeness": <1-5>, "clarity": <1-5>, "explanation": "<brief explanation>"}}]}}
+"""
+        response = groq_client.chat.completions.create(
+            messages=[{"role": "user", "content": judge_prompt}],
+            model=JUDGE_MODEL,
+            temperature=0.1,
+            max_tokens=150 * len(items) + 100,
+            response_format={"type": "json_object"}
+        )
+        try:
+            parsed = json.loads(response.choices[0].message.content)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+        results = parsed.get('results', []) if isinstance(parsed, dict) else []
+
+        expected = {item['id'] for item in items}
+        verdicts = {}
+        for verdict in results if isinstance(results, list) else []:
+            if not isinstance(verdict, dict):
+                continue
+            item_id = str(verdict.pop('id', ''))
+            if item_id in expected and self.validate_judge_verdict(verdict):
+                verdicts[item_id] = verdict
+        return verdicts
+
+    def evaluate_with_llm_judge_batch(self, items: List[Dict], batch_size: int = 5, max_retries: int = 2) -> List[Dict]:
+        """
+        Judge many (question, answer, context) items with few LLM calls.
+        Items are packed `batch_size` per request with a strict JSON schema; only
+        items whose verdicts fail validation are retried, one item per request.
+        Verdicts are cached on disk.
+        """
+        if not groq_client:
+            return [{"error": "LLM client not available"} for _ in items]
+
+        keys = [self.judge_cache_key(item['question'], item['answer'], item['context']) for item in items]
+        verdicts = {key: self.judge_cache[key] for key in keys if key in self.judge_cache}
+        pending = [
+            {'id': str(i), 'key': key, **item}
+            for i, (item, key) in enumerate(zip(items, keys))
+            if key not in verdicts
+        ]
+        # Identical items in one run only need judging once
+        pending = list({item['key']: item for item in pending}.values())
+        print(f"\n👨‍⚖️ Judging {len(pending)} items ({len(items) - len(pending)} cached) in batches of {batch_size}")
+
+        errors = {}
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            failed = []
+            # First pass packs items together; retries send each failed item on its own
+            size = batch_size if attempt == 0 else 1
+            for start in range(0, len(pending), size):
+                batch = pending[start:start + size]
+                try:
+                    batch_verdicts = self._judge_batch_request(batch)
+                except Exception as e:
+                    batch_verdicts = {}
+                    for item in batch:
+                        errors[item['key']] = f"LLM evaluation failed: {str(e)}"
+                for item in batch:
+                    if item['id'] in batch_verdicts:
+                        verdicts[item['key']] = batch_verdicts[item['id']]
+                        self.judge_cache[item['key']] = batch_verdicts[item['id']]
+                        errors.pop(item['key'], None)
+                    else:
+                        errors.setdefault(item['key'], "Could not parse a valid verdict")
+                        failed.append(item)
+            pending = failed
+
+        self.save_judge_cache()
+        return [verdicts.get(key, {"error": errors.get(key, "LLM evaluation failed")}) for key in keys]
+
+    def save_judge_cache(self):
+        if self.judge_cache_path:
+            with open(self.judge_cache_path, 'w') as f:
+                json.dump(self.judge_cache, f, indent=2)
+
+    def run_single_evaluation(self, question_data: Dict, index, run_judge: bool = True) -> Dict:
+        """Run evaluation for a single question (skip the LLM judge when it is batched by the caller)"""
         question = question_data['question']
         print(f"\n🔍 Evaluating: {question}")
         
@@ -129,13 +327,10 @@ Respond in JSON format:
         start_time = time.time()
         
         # Query the system
-        query_embedding = self.embedder.encode(question).tolist()
-        search_results = index.query(
-            vector=query_embedding,
-            top_k=3,
-            include_metadata=True,
-            namespace="rag-proj"
-        )
+        with stage("encode_query"):
+            query_embedding = self.embedder.encode(question).tolist()
+        with stage("similarity_search"):
+            search_results = retrieve(query_embedding, index, namespace=self.namespace, include_values=True)
         
         # Generate response
         response = generate_response(question, search_results.matches)
@@ -151,9 +346,12 @@ Respond in JSON format:
             question_data.get('relevant_sources', [])
         )
         
-        answer_relevance = self.evaluate_answer_relevance(question, response)
-        faithfulness = self.evaluate_faithfulness(response, context)
-        llm_judge = self.evaluate_with_llm_judge(question, response, context)
+        with stage("metrics"):
+            generation_eval = self.evaluate_generation(query_embedding, response, search_results.matches)
+        llm_judge = None
+        if run_judge:
+            with stage("llm_judge"):
+                llm_judge = self.evaluate_with_llm_judge(question, response, context)
         
         result = {
             'question_id': question_data['id'],
@@ -163,24 +361,46 @@ Respond in JSON format:
             'generated_answer': response,
             'response_time': response_time,
             'retrieval_evaluation': retrieval_eval,
-            'answer_relevance': answer_relevance,
-            'faithfulness': faithfulness,
+            'answer_relevance': generation_eval['answer_relevance'],
+            'context_relevance': generation_eval['context_relevance'],
+            'faithfulness': generation_eval['faithfulness'],
+            'sentence_support': generation_eval['sentence_support'],
             'llm_judge_scores': llm_judge,
             'retrieved_context': context[:500] + "..." if len(context) > 500 else context
         }
+        if not run_judge:
+            result['_judge_context'] = context
         
         return result
     
-    def run_full_evaluation(self, test_questions_path: str, index, output_path: str = None):
-        """Run evaluation on all test questions"""
+    @profile("evaluation")
+    def run_full_evaluation(self, test_questions_path: str, index, output_path: str = None,
+                            judge_mode: str = "batch", judge_batch_size: int = 5):
+        """Run evaluation on all test questions (judge_mode: "batch", "single" or "none")"""
+        if judge_mode not in ("batch", "single", "none"):
+            raise ValueError(f"judge_mode must be 'batch', 'single' or 'none', got {judge_mode!r}")
         questions = self.load_test_questions(test_questions_path)
         print(f"🚀 Starting evaluation with {len(questions)} questions...")
+        self.chunk_store_verified = self.verify_chunk_store(index)
         
         results = []
         for i, question_data in enumerate(questions, 1):
             print(f"\n[{i}/{len(questions)}]", end="")
-            result = self.run_single_evaluation(question_data, index)
+            result = self.run_single_evaluation(question_data, index, run_judge=judge_mode == "single")
+            if judge_mode == "none":
+                result.pop('_judge_context')
+                result['llm_judge_scores'] = {"error": "LLM judge disabled"}
             results.append(result)
+
+        if judge_mode == "batch":
+            items = [
+                {'question': r['question'], 'answer': r['generated_answer'], 'context': r.pop('_judge_context')}
+                for r in results
+            ]
+            with stage("llm_judge"):
+                verdicts = self.evaluate_with_llm_judge_batch(items, batch_size=judge_batch_size)
+            for result, verdict in zip(results, verdicts):
+                result['llm_judge_scores'] = verdict
             
         # Calculate aggregate metrics
         summary = self.calculate_summary_metrics(results)
@@ -193,7 +413,7 @@ Respond in JSON format:
         
         # Save results
         if output_path:
-            with open(output_path, 'w') as f:
+            with stage("json_serialize"), open(output_path, 'w') as f:
                 json.dump(evaluation_report, f, indent=2)
             print(f"\n💾 Results saved to {output_path}")
         
@@ -208,10 +428,12 @@ Respond in JSON format:
         # Retrieval metrics
         avg_precision = np.mean([r['retrieval_evaluation']['precision_at_k'] for r in results])
         avg_similarity = np.mean([r['retrieval_evaluation']['avg_similarity_score'] for r in results])
+        avg_num_retrieved = np.mean([r['retrieval_evaluation']['num_retrieved'] for r in results])
         
         # Generation metrics
         avg_relevance = np.mean([r['answer_relevance'] for r in results])
         avg_faithfulness = np.mean([r['faithfulness'] for r in results])
+        avg_context_relevance = np.mean([r.get('context_relevance', 0) for r in results])
         avg_response_time = np.mean([r['response_time'] for r in results])
         
         # LLM Judge metrics (if available)
@@ -229,11 +451,13 @@ Respond in JSON format:
             'num_questions': len(results),
             'retrieval_metrics': {
                 'avg_precision_at_k': avg_precision,
-                'avg_similarity_score': avg_similarity
+                'avg_similarity_score': avg_similarity,
+                'avg_num_retrieved': avg_num_retrieved
             },
             'generation_metrics': {
                 'avg_answer_relevance': avg_relevance,
                 'avg_faithfulness': avg_faithfulness,
+                'avg_context_relevance': avg_context_relevance,
                 'avg_response_time': avg_response_time
             },
             'llm_judge_metrics': llm_summary
@@ -250,13 +474,15 @@ Respond in JSON format:
         
         print("\n🔍 RETRIEVAL METRICS:")
         ret_metrics = summary['retrieval_metrics']
-        print(f"  • Precision@3: {ret_metrics['avg_precision_at_k']:.3f}")
+        print(f"  • Precision@K: {ret_metrics['avg_precision_at_k']:.3f}")
+        print(f"  • Avg Context Chunks: {ret_metrics['avg_num_retrieved']:.2f}")
         print(f"  • Avg Similarity: {ret_metrics['avg_similarity_score']:.3f}")
         
         print("\n🤖 GENERATION METRICS:")
         gen_metrics = summary['generation_metrics']
         print(f"  • Answer Relevance: {gen_metrics['avg_answer_relevance']:.3f}")
         print(f"  • Faithfulness: {gen_metrics['avg_faithfulness']:.3f}")
+        print(f"  • Context Relevance: {gen_metrics['avg_context_relevance']:.3f}")
         
         if summary.get('llm_judge_metrics'):
             print("\n👨‍⚖️ LLM JUDGE SCORES (1-5):")
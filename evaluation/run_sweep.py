@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Ingestion-config sweep: build one index variant per (chunk size, overlap, encoder),
+benchmark retrieval and run RAGEvaluator on each, and print one comparison table.
+
+PDF text is extracted once and each encoder is loaded once; variants are chunked
+and encoded in parallel into separate in-memory indexes (or Pinecone namespaces).
+
+Usage:
+    python evaluation/run_sweep.py --chunk-sizes 300,500,800 --overlaps 0,50 \
+        --encoders sentence-transformers/all-MiniLM-L6-v2 --fake-llm
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+import numpy as np
+from dotenv import load_dotenv
+from sentence_transformers import SentenceTransformer
+
+import utils.embedding as embedding
+from utils.chunking import extract_texts, chunk_texts
+from utils.dedup import dedupe_chunks
+from utils.embedding import retrieve
+from utils.local_index import LocalIndex
+from rag_evaluator import RAGEvaluator
+
+load_dotenv()
+
+
+def variant_name(chunk_size, overlap, encoder_name):
+    # Full model name: org/x and other-org/x must not share a namespace
+    return f"cs{chunk_size}-ov{overlap}-{encoder_name.replace('/', '_')}"
+
+
+def parse_list(value, cast=str):
+    """Comma-separated CLI list, duplicates dropped (order kept)."""
+    return list(dict.fromkeys(cast(x.strip()) for x in value.split(",") if x.strip()))
+
+
+def build_variant(texts, chunk_size, overlap, encoder_name, encoder, index, dedup):
+    """Chunk, (dedupe,) encode and upsert one variant into its own namespace."""
+    name = variant_name(chunk_size, overlap, encoder_name)
+    start = time.perf_counter()
+    chunks = chunk_texts(texts, chunk_size, overlap)
+    if dedup:
+        chunks = dedupe_chunks(chunks)
+    vectors = np.asarray(encoder.encode([c.page_content for c in chunks], batch_size=64), dtype=np.float32)
+
+    # Re-runs reuse namespace names: drop the previous build so no stale doc-i vectors remain
+    try:
+        index.delete(delete_all=True, namespace=name)
+    except Exception:
+        pass  # Pinecone raises if the namespace does not exist yet
+
+    payload = [
+        {
+            "id": f"doc-{i}",
+            "values": v.tolist(),
+            "metadata": {
+                "text": chunk.page_content,
+                "source": chunk.metadata.get("source", "unknown"),
+                "sources": chunk.metadata.get("sources", [chunk.metadata.get("source", "unknown")]),
+            },
+        }
+        for i, (chunk, v) in enumerate(zip(chunks, vectors))
+    ]
+    for i in range(0, len(payload), 100):
+        index.upsert(vectors=payload[i:i + 100], namespace=name)
+
+    text_bytes = sum(len(c.page_content.encode("utf-8")) for c in chunks)
+    return {
+        "variant": name,
+        "chunk_size": chunk_size,
+        "chunk_overlap": overlap,
+        "encoder": encoder_name,
+        "num_chunks": len(chunks),
+        "index_mb": (vectors.nbytes + text_bytes) / 1e6,
+        "build_seconds": time.perf_counter() - start,
+        "vectors": vectors,
+    }
+
+
+def wait_until_indexed(index, builds, timeout=300.0, interval=2.0):
+    """Pinecone upserts are eventually consistent: wait until every namespace reports all its vectors."""
+    expected = {b["variant"]: b["num_chunks"] for b in builds}
+    deadline = time.time() + timeout
+    while True:
+        namespaces = index.describe_index_stats().namespaces
+        pending = {name: (getattr(namespaces.get(name), "vector_count", 0), n)
+                   for name, n in expected.items() if getattr(namespaces.get(name), "vector_count", 0) < n}
+        if not pending:
+            return
+        if time.time() > deadline:
+            raise TimeoutError(f"Namespaces still indexing after {timeout:.0f}s (have, want): {pending}")
+        print(f"⏳ Waiting for Pinecone to index {len(pending)} namespaces...")
+        time.sleep(interval)
+
+
+def benchmark_retrieval(questions, encoder, index, namespace, repeats=3):
+    """Encode + search latency per question, in milliseconds."""
+    latencies = []
+    for _ in range(repeats):
+        for q in questions:
+            start = time.perf_counter()
+            retrieve(encoder.encode(q['question']).tolist(), index, namespace=namespace)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def _fmt(value, width, digits=3):
+    return f"{value:>{width}.{digits}f}" if value is not None else f"{'-':>{width}}"
+
+
+def print_table(rows):
+    width = max([len("variant")] + [len(r["variant"]) for r in rows]) + 2
+    header = f"{'variant':<{width}}{'chunks':>7}{'MB':>7}{'build s':>9}{'p50 ms':>8}{'p95 ms':>8}" \
+             f"{'P@K':>7}{'ctxRel':>8}{'faith':>7}{'ansRel':>8}{'judge':>7}"
+    print("\n" + "=" * len(header))
+    print("📊 INGESTION SWEEP")
+    print("=" * len(header))
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        judge = f"{r['judge_avg']:.2f}" if r['judge_avg'] is not None else "-"
+        print(f"{r['variant']:<{width}}{r['num_chunks']:>7}{r['index_mb']:>7.2f}{r['build_seconds']:>9.1f}"
+              f"{r['retrieval_p50_ms']:>8.1f}{r['retrieval_p95_ms']:>8.1f}{r['precision_at_k']:>7.3f}"
+              f"{r['context_relevance']:>8.3f}{_fmt(r['faithfulness'], 7)}{_fmt(r['answer_relevance'], 8)}{judge:>7}")
+    print("=" * len(header))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and benchmark multiple ingestion configs")
+    parser.add_argument("--chunk-sizes", default="300,500,800")
+    parser.add_argument("--overlaps", default="0,50")
+    parser.add_argument("--encoders", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--no-dedup", action="store_true")
+    parser.add_argument("--workers", type=int, default=4, help="variants built in parallel")
+    parser.add_argument("--pinecone-index", default=None,
+                        help="build into namespaces of this Pinecone index instead of local indexes")
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="skip Groq: fixed answers, no judge, generation metrics not reported")
+    parser.add_argument("--judge", choices=["batch", "single", "none"], default="batch")
+    parser.add_argument("--questions", default=str(ROOT / "evaluation" / "test_questions.json"))
+    parser.add_argument("--output", default=str(ROOT / "evaluation" / "sweep_results.json"))
+    args = parser.parse_args()
+
+    chunk_sizes = parse_list(args.chunk_sizes, int)
+    overlaps = parse_list(args.overlaps, int)
+    encoder_names = parse_list(args.encoders)
+    grid = [(cs, ov, enc) for cs, ov, enc in product(chunk_sizes, overlaps, encoder_names) if ov < cs]
+    # Parallel builds clear and fill their namespace: two variants must never share one
+    names = [variant_name(*v) for v in grid]
+    clashes = sorted({name for name in names if names.count(name) > 1})
+    if clashes:
+        parser.error(f"variants map to the same namespace: {clashes}")
+
+    print(f"🚀 Sweeping {len(grid)} variants")
+    texts = extract_texts(ROOT / "data" / "pdfs")
+    print(f"📄 Extracted {len(texts)} PDFs once, shared by all variants")
+    encoders = {name: SentenceTransformer(name) for name in encoder_names}
+
+    if args.pinecone_index:
+        # One Pinecone index has one dimension, so every encoder must match it
+        from pinecone import Pinecone
+        index = Pinecone(os.environ.get("PINECONE_API_KEY")).Index(args.pinecone_index)
+        index_dim = index.describe_index_stats().dimension
+        dims = {name: enc.get_sentence_embedding_dimension() for name, enc in encoders.items()}
+        mismatched = {name: dim for name, dim in dims.items() if dim != index_dim}
+        if mismatched:
+            parser.error(f"--pinecone-index {args.pinecone_index} has dimension {index_dim}; "
+                         f"encoders {mismatched} don't match. Sweep them locally or per index.")
+    else:
+        index = LocalIndex()
+
+    judge_mode = args.judge
+    if args.fake_llm:
+        from utils.fake_llm import FakeGroqClient
+        embedding.groq_client = FakeGroqClient(latency=0.0)
+        judge_mode = "none"
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        builds = list(pool.map(
+            lambda v: build_variant(texts, v[0], v[1], v[2], encoders[v[2]], index, not args.no_dedup),
+            grid
+        ))
+    if args.pinecone_index:
+        wait_until_indexed(index, builds)
+
+    with open(args.questions, 'r') as f:
+        questions = json.load(f)['test_questions']
+    rows = []
+    for build in builds:
+        name = build["variant"]
+        print(f"\n🔬 Evaluating {name}")
+        encoder = encoders[build["encoder"]]
+        p50, p95 = benchmark_retrieval(questions, encoder, index, name)
+
+        evaluator = RAGEvaluator(judge_cache_path=str(ROOT / "evaluation" / "judge_cache.json"),
+                                 embeddings_path=None, encoder=encoder, namespace=name)
+        evaluator.chunk_embeddings = build.pop("vectors")
+        report = evaluator.run_full_evaluation(args.questions, index, judge_mode=judge_mode)
+        summary = report['summary']
+        judge = summary.get('llm_judge_metrics') or {}
+
+        rows.append({
+            **build,
+            "retrieval_p50_ms": p50,
+            "retrieval_p95_ms": p95,
+            "precision_at_k": float(summary['retrieval_metrics']['avg_precision_at_k']),
+            "avg_context_chunks": float(summary['retrieval_metrics']['avg_num_retrieved']),
+            "context_relevance": float(summary['generation_metrics']['avg_context_relevance']),
+            # With --fake-llm every answer is the same canned string: generation metrics are meaningless
+            "faithfulness": None if args.fake_llm else float(summary['generation_metrics']['avg_faithfulness']),
+            "answer_relevance": None if args.fake_llm else float(summary['generation_metrics']['avg_answer_relevance']),
+            "avg_response_time": float(summary['generation_metrics']['avg_response_time']),
+            "judge_avg": float(np.mean(list(judge.values()))) if judge else None,
+        })
+
+    print_table(rows)
+    with open(args.output, "w") as f:
+        json.dump({"variants": rows, "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=2)
+    print(f"💾 Sweep results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ sys.path.append('..')
 
 from dotenv import load_dotenv
 from pinecone import Pinecone
-from utils.embedding import generate_response, embedder
+from utils.embedding import generate_response, embedder, retrieve
 import time
 
 load_dotenv()
@@ -29,12 +29,7 @@ def evaluate_single_question(question: str, expected_category: str = ""):
     
     # Get embeddings and search
     query_embedding = embedder.encode(question).tolist()
-    search_results = index.query(
-        vector=query_embedding,
-        top_k=3,
-        include_metadata=True,
-        namespace="rag-proj"
-    )
+    search_results = retrieve(query_embedding, index)
     
     # Generate response
     response = generate_response(question, search_results.matches)
@@ -44,6 +39,7 @@ def evaluate_single_question(question: str, expected_category: str = ""):
     # Display results
     print(f"⏱️  Response Time: {end_time - start_time:.2f}s")
     print(f"📝 Category: {expected_category}")
+    print(f"📚 Context Chunks Used: {len(search_results.matches)}")
     
     print(f"\n🤖 Generated Answer:")
     print("-" * 40)
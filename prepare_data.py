@@ -2,29 +2,56 @@
 from pathlib import Path
 import os
 from utils.chunking import extract_docs
+from utils.dedup import dedupe_chunks
+from utils.hot_reload import bump_manifest, read_manifest
 from utils.embedding import generate_embeddings
 from utils.io import save_chunks_to_json, save_embeddings, load_embeddings, load_chunks_from_json
 
-def prepare_data(index): 
+def prepare_data(index, chunk_size=500, chunk_overlap=50, dedup=True): 
     base_dir = Path(__file__).resolve().parent  # This gives project root
     pdf_dir = base_dir / "data" / "pdfs"
 
-
-    chunks = extract_docs(pdf_dir, 500, 50)
     chunks_file = "saved/chunks.json"
     embeddings_file = "saved/embeddings.npy"
+    config = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "dedup": dedup}
+
+    chunks = load_chunks_from_json(chunks_file) if os.path.exists(chunks_file) else None
+    if chunks is not None and not _chunks_match_config(chunks, config):
+        print("♻️  Saved chunks were built with a different ingestion config, re-extracting")
+        chunks = None
 
-    if not os.path.exists(chunks_file):
-        chunks = extract_docs("data/pdfs")
+    regenerate_embeddings = chunks is None
+    if chunks is None:
+        chunks = extract_docs(pdf_dir, chunk_size, chunk_overlap)
+        # Drop near-duplicate boilerplate before it costs embedding time and retrieval slots
+        if dedup:
+            chunks = dedupe_chunks(chunks)
         save_chunks_to_json(chunks, chunks_file)
-    else:
-        chunks = load_chunks_from_json(chunks_file)
     # print(f"{chunks[9]}")
-        
-    if not os.path.exists(embeddings_file):
-        embeddings = generate_embeddings(chunks, index)
-        save_embeddings(embeddings, embeddings_file)
-    else:
-        from utils.io import load_embeddings
+
+    if not regenerate_embeddings and os.path.exists(embeddings_file):
         embeddings = load_embeddings(embeddings_file)
+        if len(embeddings) != len(chunks):
+            print(f"♻️  {len(embeddings)} saved embeddings for {len(chunks)} chunks, re-encoding")
+            regenerate_embeddings = True
+    else:
+        regenerate_embeddings = True
+
+    if regenerate_embeddings:
+        # replace=True clears the namespace, so no vectors from a previous (larger) run survive
+        embeddings = generate_embeddings(chunks, index, replace=True)
+        save_embeddings(embeddings, embeddings_file)
+        # Tell running query processes a new generation is ready (see utils/hot_reload.py)
+        bump_manifest(chunks_file, embeddings_file, len(chunks), config=config)
+
+    return chunks, embeddings
+
 
+def _chunks_match_config(chunks, config):
+    """Whether saved chunks were built with `config` (from the manifest, else inferred from dedup metadata)."""
+    manifest = read_manifest()
+    if manifest and manifest.get("config"):
+        return manifest["config"] == config
+    # No manifest (e.g. fresh checkout): deduped chunks always carry metadata['sources']
+    is_deduped = all("sources" in c.metadata for c in chunks)
+    return is_deduped == config["dedup"]
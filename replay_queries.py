@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Replay a captured query log (RAG_QUERY_LOG) against the RAG pipeline.
+
+Open-loop: each query is fired at its original offset divided by --speed,
+whether or not earlier queries have finished, and latency is measured from the
+scheduled send time so a slow back end can't hide its own queueing delay.
+
+Usage:
+    python replay_queries.py saved/query_log.jsonl --speed 5 --fake-llm --fake-index
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+
+import utils.embedding as embedding
+from utils.fake_llm import FakeGroqClient
+from utils.local_index import LocalIndex
+from utils.querylog import read_query_log
+
+load_dotenv()
+
+
+def connect_index(args):
+    if args.fake_index:
+        print("✅ Using in-memory index from saved/ artifacts")
+        return LocalIndex.from_saved(latency=args.index_latency)
+    from pinecone import Pinecone
+    pc = Pinecone(os.environ.get("PINECONE_API_KEY"))
+    print("✅ Connected to Pinecone")
+    return pc.Index(args.index_name)
+
+
+def replay(records, index, speed: float, repeat: int, workers: int):
+    """Fire every record on its (scaled) original schedule and collect latencies/errors."""
+    offsets = []
+    t0 = records[0]["timestamp"]
+    span = records[-1]["timestamp"] - t0
+    # Repeats are laid end to end with one average inter-arrival gap between them
+    gap = span / max(len(records) - 1, 1)
+    for r in range(repeat):
+        for record in records:
+            offsets.append(((record["timestamp"] - t0) + r * (span + gap), record["query"]))
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def run_one(scheduled, text):
+        try:
+            answer = embedding.answer_query(text, index)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            if answer["ok"]:
+                latencies.append(time.perf_counter() - scheduled)
+            else:
+                # generate_response reports LLM failures (e.g. 429s) as text, not exceptions
+                errors.append(answer["response"])
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for offset, text in offsets:
+            scheduled = start + offset / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run_one, scheduled, text)
+    elapsed = time.perf_counter() - start
+
+    return latencies, errors, elapsed, span * repeat / speed
+
+
+def print_report(latencies, errors, elapsed, target_duration):
+    total = len(latencies) + len(errors)
+    print("\n" + "=" * 60)
+    print("📈 REPLAY SUMMARY")
+    print("=" * 60)
+    print(f"📝 Queries sent: {total}")
+    print(f"⏱️  Wall time: {elapsed:.2f}s (schedule span {target_duration:.2f}s)")
+    print(f"🚀 Achieved throughput: {total / elapsed:.2f} qps" if elapsed else "🚀 Achieved throughput: n/a")
+    print(f"❌ Error rate: {len(errors) / total:.2%} ({len(errors)} errors)" if total else "❌ Error rate: n/a")
+    if latencies:
+        ms = np.array(latencies) * 1000
+        print("\n⏱️  LATENCY (ms, from scheduled send time):")
+        for p in (50, 90, 95, 99):
+            print(f"  • p{p}: {np.percentile(ms, p):.1f}")
+        print(f"  • max: {ms.max():.1f}")
+    if errors:
+        print("\nFirst errors:")
+        for e in errors[:5]:
+            print(f"  - {e}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured RAG query log")
+    parser.add_argument("log", help="query log written via RAG_QUERY_LOG")
+    parser.add_argument("--speed", type=float, default=1.0, help="rate multiplier (2 = twice the original rate)")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the log this many times back to back")
+    parser.add_argument("--limit", type=int, default=None, help="only replay the first N records")
+    parser.add_argument("--workers", type=int, default=64, help="max concurrent in-flight queries")
+    parser.add_argument("--fake-llm", action="store_true", help="replace Groq with a fixed-latency fake")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="fake LLM latency in seconds")
+    parser.add_argument("--fake-index", action="store_true", help="use an in-memory index built from saved/")
+    parser.add_argument("--index-latency", type=float, default=0.0, help="fake index latency in seconds")
+    parser.add_argument("--index-name", default="ragproj-v1")
+    args = parser.parse_args()
+
+    records = read_query_log(args.log)[:args.limit]
+    if not records:
+        print(f"❌ No query records found in {args.log}")
+        return
+
+    if args.fake_llm:
+        embedding.groq_client = FakeGroqClient(args.llm_latency)
+        print(f"✅ Using fake LLM ({args.llm_latency:.2f}s latency)")
+
+    index = connect_index(args)
+
+    print(f"🔁 Replaying {len(records)} queries x{args.repeat} at {args.speed}x speed")
+    print_report(*replay(records, index, args.speed, args.repeat, args.workers))
+
+
+if __name__ == "__main__":
+    main()
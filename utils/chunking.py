@@ -9,23 +9,32 @@ def extract_text_from_pdf(file_path):
     doc = fitz.open(file_path)
     return "\n".join([page.get_text() for page in doc])
 
-def extract_docs(folder_path, chunk_size=500, chunk_overlap=50):
-    """Extracts and chunks documents from all PDFs in a folder, returns list of Documents with metadata."""
+def extract_texts(folder_path):
+    """Extracts full text of every PDF in a folder, returns {file name: text}. Reusable across chunking configs."""
+    return {
+        file: extract_text_from_pdf(os.path.join(folder_path, file))
+        for file in os.listdir(folder_path)
+        if file.lower().endswith(".pdf")
+    }
+
+def chunk_texts(texts, chunk_size=500, chunk_overlap=50):
+    """Chunks already-extracted texts ({file name: text}), returns list of Documents with metadata."""
     splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     all_chunks = []
 
-    for file in os.listdir(folder_path):
-        if file.lower().endswith(".pdf"):
-            file_path = os.path.join(folder_path, file)
-            raw_text = extract_text_from_pdf(file_path)
-            chunks = splitter.create_documents([raw_text])
-            
-            # Attach metadata
-            for chunk in chunks:
-                chunk.metadata = {
-                    "source": file
-                }
-            all_chunks.extend(chunks)
+    for file, raw_text in texts.items():
+        chunks = splitter.create_documents([raw_text])
+        
+        # Attach metadata
+        for chunk in chunks:
+            chunk.metadata = {
+                "source": file
+            }
+        all_chunks.extend(chunks)
 
     return all_chunks
 
+def extract_docs(folder_path, chunk_size=500, chunk_overlap=50):
+    """Extracts and chunks documents from all PDFs in a folder, returns list of Documents with metadata."""
+    return chunk_texts(extract_texts(folder_path), chunk_size, chunk_overlap)
+
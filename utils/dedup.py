@@ -0,0 +1,101 @@
+"""
+Near-duplicate chunk elimination with MinHash + LSH.
+
+Issuer MITC documents share a lot of RBI-mandated boilerplate, and chunk overlap adds
+more. Chunks whose word-shingle Jaccard similarity is above `threshold` are merged
+into one canonical chunk (the first seen) that lists every source it appeared in.
+Runs in roughly linear time: each chunk is only compared with its LSH bucket-mates.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import List
+
+import numpy as np
+from langchain.schema import Document
+
+_PRIME = (1 << 31) - 1  # Mersenne prime, keeps a*x+b inside uint64
+
+
+def _shingles(text: str, k: int) -> np.ndarray:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= k:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + k]) for i in range(len(words) - k + 1)]
+    return np.unique(np.array([zlib.crc32(g.encode("utf-8")) % _PRIME for g in grams], dtype=np.uint64))
+
+
+def minhash_signatures(texts: List[str], num_perm: int = 128, shingle_size: int = 5, seed: int = 42) -> np.ndarray:
+    """MinHash signature matrix of shape (len(texts), num_perm)."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for i, text in enumerate(texts):
+        shingles = _shingles(text, shingle_size)
+        signatures[i] = ((np.outer(shingles, a) + b) % _PRIME).min(axis=0)
+    return signatures
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicate_clusters(texts: List[str], threshold: float = 0.8, num_perm: int = 128,
+                            bands: int = 16, shingle_size: int = 5) -> List[List[int]]:
+    """Group indices of near-duplicate texts. Each cluster is sorted, first index is canonical."""
+    signatures = minhash_signatures(texts, num_perm, shingle_size)
+    rows = num_perm // bands
+    parent = list(range(len(texts)))
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        band_sig = signatures[:, band * rows:(band + 1) * rows]
+        for i, row in enumerate(band_sig):
+            buckets[row.tobytes()].append(i)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            head = members[0]
+            for other in members[1:]:
+                root_head, root_other = _find(parent, head), _find(parent, other)
+                if root_head == root_other:
+                    continue
+                # Verify the LSH candidate with the estimated Jaccard similarity
+                if np.mean(signatures[head] == signatures[other]) >= threshold:
+                    parent[max(root_head, root_other)] = min(root_head, root_other)
+
+    clusters = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[_find(parent, i)].append(i)
+    return sorted(clusters.values())
+
+
+def dedupe_chunks(chunks: List[Document], threshold: float = 0.8) -> List[Document]:
+    """Keep one canonical chunk per near-duplicate cluster, with all sources in metadata['sources']."""
+    if not chunks:
+        return chunks
+    clusters = near_duplicate_clusters([c.page_content for c in chunks], threshold=threshold)
+
+    deduped = []
+    for cluster in clusters:
+        canonical = chunks[cluster[0]]
+        sources = []
+        for i in cluster:
+            source = chunks[i].metadata.get("source", "unknown")
+            if source not in sources:
+                sources.append(source)
+        metadata = dict(canonical.metadata)
+        metadata["sources"] = sources
+        deduped.append(Document(page_content=canonical.page_content, metadata=metadata))
+
+    removed = len(chunks) - len(deduped)
+    merged = sum(1 for c in clusters if len(c) > 1)
+    print(f"🧹 Dedup: {len(chunks)} → {len(deduped)} chunks "
+          f"({removed} removed, {removed / len(chunks):.1%} smaller index, {merged} clusters merged)")
+    return deduped
@@ -1,6 +1,11 @@
 from sentence_transformers import SentenceTransformer
 import os
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
+from utils.profiling import profile, stage, collect_stage_timings
+from utils.querylog import log_query, read_query_log
+from utils.local_index import QueryResult
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,7 +25,87 @@ try:
 except ImportError:
     print("⚠️  Groq not installed. Running in retrieval-only mode.")
 
-def generate_embeddings(chunks, index):
+# In-process LRU caches for the query path. The answer cache is off by default
+# because it returns a stored answer for a repeated (query, retrieved chunks) pair.
+EMBEDDING_CACHE_SIZE = int(os.environ.get("RAG_EMBEDDING_CACHE_SIZE", "1024"))
+ANSWER_CACHE_SIZE = int(os.environ.get("RAG_ANSWER_CACHE_SIZE", "0"))
+_embedding_cache = OrderedDict()
+_answer_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(cache, key):
+    with _cache_lock:
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    return None
+
+
+def _cache_put(cache, key, value, max_size):
+    if max_size <= 0:
+        return
+    with _cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+def _answer_key(text, matches):
+    """Cache key for an answer. IDs are positional (doc-<i>) and get reused by a new ingestion
+    or hot-reload generation, so the chunk text is part of the key too."""
+    return (text, tuple((match.id, hash(match.metadata.get("text", ""))) for match in matches))
+
+
+def encode_query(text):
+    """Encode a query string, returning (vector as list, cache hit)."""
+    cached = _cache_get(_embedding_cache, text)
+    if cached is not None:
+        return cached, True
+    vector = embedder.encode(text).tolist()
+    _cache_put(_embedding_cache, text, vector, EMBEDDING_CACHE_SIZE)
+    return vector, False
+
+
+# Retrieval depth. With RAG_ADAPTIVE_TOPK=1 we over-fetch RAG_TOPK_MAX matches and cut the
+# list at the first big score gap or below a similarity floor, keeping at least RAG_TOPK_MIN.
+TOP_K = int(os.environ.get("RAG_TOP_K", "3"))
+ADAPTIVE_TOPK = os.environ.get("RAG_ADAPTIVE_TOPK") == "1"
+TOPK_MIN = int(os.environ.get("RAG_TOPK_MIN", "1"))
+TOPK_MAX = int(os.environ.get("RAG_TOPK_MAX", "6"))
+TOPK_MAX_GAP = float(os.environ.get("RAG_TOPK_GAP", "0.08"))
+TOPK_MIN_SCORE = float(os.environ.get("RAG_TOPK_MIN_SCORE", "0.3"))
+
+
+def adaptive_cutoff(scores, min_k=TOPK_MIN, max_k=TOPK_MAX, max_gap=TOPK_MAX_GAP, min_score=TOPK_MIN_SCORE):
+    """Number of matches to keep from a descending score list."""
+    keep = min(len(scores), max_k)
+    for i in range(max(min_k, 1), keep):
+        if scores[i - 1] - scores[i] >= max_gap or scores[i] < min_score:
+            return i
+    return keep
+
+
+def retrieve(query_embedding, index, adaptive=None, namespace="rag-proj", include_values=False):
+    """Query the index with a fixed or adaptive top-k. Returns a result with `.matches`."""
+    adaptive = ADAPTIVE_TOPK if adaptive is None else adaptive
+    result = index.query(
+        vector=query_embedding,
+        top_k=TOPK_MAX if adaptive else TOP_K,
+        include_metadata=True, 
+        include_values=include_values,
+        namespace=namespace
+    )
+    if not adaptive:
+        return result
+    matches = list(result.matches)
+    return QueryResult(matches[:adaptive_cutoff([m.score for m in matches])])
+
+
+def generate_embeddings(chunks, index, replace=False, namespace="rag-proj", batch_size=100):
+    """Encode chunks and upsert them as doc-<i>. With replace=True the namespace is cleared first,
+    so positional IDs from a previous, larger ingestion can't linger with stale text."""
 # Load embedding model
     sentences = [x.page_content for x in chunks]
     # print("sentences: ")
@@ -35,29 +120,46 @@ def generate_embeddings(chunks, index):
             "values": e.tolist(),
             "metadata": {
                 "text": chunk.page_content,
-                "source": chunk.metadata.get("source", "unknown")
+                "source": chunk.metadata.get("source", "unknown"),
+                # every issuer document a deduplicated chunk appeared in
+                "sources": chunk.metadata.get("sources", [chunk.metadata.get("source", "unknown")])
             }
         })
-    index.upsert(vectors=vectors, namespace="rag-proj")
+    if replace:
+        try:
+            index.delete(delete_all=True, namespace=namespace)
+        except Exception as e:
+            # Pinecone raises if the namespace does not exist yet
+            print(f"ℹ️  Namespace '{namespace}' not cleared: {e}")
+    for start in range(0, len(vectors), batch_size):
+        index.upsert(vectors=vectors[start:start + batch_size], namespace=namespace)
 
     return embeddings
 
 
 def generate_response(query, retrieved_chunks):
     """Generate a natural language response using Groq LLM"""
+    response, _ = generate_response_with_status(query, retrieved_chunks)
+    return response
+
+
+@profile("generate_response")
+def generate_response_with_status(query, retrieved_chunks):
+    """Like generate_response, but returns (response, ok) so failures can be told apart from answers"""
     
     # Check if Groq client is available
     if not groq_client:
-        return "🔍 LLM response generation not available. Please set GROQ_API_KEY in your .env file to get AI-generated answers."
-    
-    # Prepare context from retrieved chunks
-    context = "\n\n".join([
-        f"Source: {chunk.metadata.get('source', 'unknown')}\n{chunk.metadata.get('text', '')}"
-        for chunk in retrieved_chunks
-    ])
+        return "🔍 LLM response generation not available. Please set GROQ_API_KEY in your .env file to get AI-generated answers.", False
     
-    # Create prompt
-    prompt = f"""You are a helpful assistant that answers questions about credit cards based on the provided documentation.
+    with stage("prompt_build"):
+        # Prepare context from retrieved chunks
+        context = "\n\n".join([
+            f"Source: {chunk.metadata.get('source', 'unknown')}\n{chunk.metadata.get('text', '')}"
+            for chunk in retrieved_chunks
+        ])
+        
+        # Create prompt
+        prompt = f"""You are a helpful assistant that answers questions about credit cards based on the provided documentation.
 
 Context from credit card documents:
 {context}
@@ -70,42 +172,67 @@ Answer:"""
 
     try:
         # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama3-8b-8192",  # Fast and free model
-            temperature=0.1,  # Low temperature for more consistent answers
-            max_tokens=500,
-        )
+        with stage("llm_call"):
+            chat_completion = groq_client.chat.completions.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model="llama3-8b-8192",  # Fast and free model
+                temperature=0.1,  # Low temperature for more consistent answers
+                max_tokens=500,
+            )
         
-        return chat_completion.choices[0].message.content
+        return chat_completion.choices[0].message.content, True
     
     except Exception as e:
-        return f"Error generating response: {str(e)}"
+        return f"Error generating response: {str(e)}", False
 
 
-def query(input, index): 
-    #query the embedding model
-    query_embedding = embedder.encode(input)
-    query_embedding = query_embedding.tolist()
-    # print(f"Query Embedding: {query_embedding}")
-    result = index.query(
-        vector=query_embedding,
-        top_k=3,
-        include_metadata=True, 
-        namespace="rag-proj"
-    )
+@profile("query")
+def answer_query(input, index):
+    """
+    Retrieve + generate without printing. Returns a dict with the index result, the
+    response, whether generation succeeded (`ok`) and cache hits. Only successful
+    answers are cached, so a transient Groq failure is not replayed from cache.
+    """
+    with collect_stage_timings() as timings:
+        #query the embedding model (tokenization + model forward)
+        with stage("encode_query"):
+            query_embedding, embedding_hit = encode_query(input)
+        # print(f"Query Embedding: {query_embedding}")
+        with stage("similarity_search"):
+            result = retrieve(query_embedding, index)
+
+        # Generate LLM response
+        answer_key = _answer_key(input, result.matches)
+        response = _cache_get(_answer_cache, answer_key)
+        answer_hit = response is not None
+        ok = True
+        if not answer_hit:
+            response, ok = generate_response_with_status(input, result.matches)
+            if ok:
+                _cache_put(_answer_cache, answer_key, response, ANSWER_CACHE_SIZE)
+
+    cache_hits = {"embedding": embedding_hit, "answer": answer_hit}
+    log_query(input, result.matches, timings, cache_hits, ok)
+    return {"result": result, "response": response, "ok": ok, "cache_hits": cache_hits}
+
+
+def query(input, index, verbose=True): 
+    answer = answer_query(input, index)
+    result, response = answer["result"], answer["response"]
+
+    if not verbose:
+        return result
 
     print("Query Results:")
     print(f"Input query: '{input}'")
+    print(f"Context chunks used: {len(result.matches)}")
     print("-" * 80)
     
-    # Generate LLM response
-    response = generate_response(input, result.matches)
     print(f"\n🤖 AI Response:")
     print(f"{response}")
     print("-" * 80)
@@ -117,4 +244,22 @@ def query(input, index):
         print(f"Text: {match.metadata.get('text', 'No text available')[:200]}...")
         print("-" * 40)
     
-    return result
\ No newline at end of file
+    return result
+
+
+def warm_caches(log_path, index, limit=None):
+    """Pre-warm the embedding (and answer, if enabled) caches from a captured query log."""
+    recent = {}
+    for record in reversed(read_query_log(log_path)):  # most recent queries win the LRU slots
+        recent.setdefault(record["query"], None)
+    texts = list(recent)[:limit or EMBEDDING_CACHE_SIZE]
+    for text in reversed(texts):
+        query_embedding, _ = encode_query(text)
+        if ANSWER_CACHE_SIZE > 0:
+            result = retrieve(query_embedding, index)
+            answer_key = _answer_key(text, result.matches)
+            if _cache_get(_answer_cache, answer_key) is None:
+                response, ok = generate_response_with_status(text, result.matches)
+                if ok:
+                    _cache_put(_answer_cache, answer_key, response, ANSWER_CACHE_SIZE)
+    print(f"🔥 Warmed caches with {len(texts)} queries from {log_path}")
@@ -0,0 +1,34 @@
+"""
+Offline stand-in for the Groq client, for load tests and benchmarks that should
+measure the rest of the pipeline (replay_queries.py, evaluation/run_sweep.py).
+"""
+
+import time
+
+
+class _FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class _FakeChoice:
+    def __init__(self, content):
+        self.message = _FakeMessage(content)
+
+
+class _FakeCompletion:
+    def __init__(self, content):
+        self.choices = [_FakeChoice(content)]
+
+
+class FakeGroqClient:
+    """Stands in for groq.Groq: sleeps for a fixed latency and returns a canned answer."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.chat = self
+        self.completions = self
+
+    def create(self, messages, **kwargs):
+        time.sleep(self.latency)
+        return _FakeCompletion("Fake answer for load testing.")
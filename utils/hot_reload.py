@@ -0,0 +1,151 @@
+"""
+Zero-downtime reload of the in-memory search index.
+
+prepare_data bumps a generation number in saved/manifest.json after it writes new
+chunks/embeddings. Each generation's artifacts are copied to their own directory
+(saved/generations/gen-<n>/) before the manifest points at them, so a reader never
+pairs new chunks with old embeddings while saved/ is being rewritten.
+ReloadableIndex polls that manifest from a background thread, builds the next
+LocalIndex off the query path and swaps it in with one reference assignment. Queries that already picked up the old generation finish on it; its
+buffers are freed once the last of them returns. The embedding model is untouched,
+so there is no cold-start spike.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+from utils.local_index import LocalIndex
+
+MANIFEST_FILE = "saved/manifest.json"
+KEEP_GENERATIONS = 3  # older generation directories are pruned on publish
+
+
+def read_manifest(manifest_file=MANIFEST_FILE):
+    if not os.path.exists(manifest_file):
+        return None
+    try:
+        with open(manifest_file, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None  # mid-write; picked up on the next poll
+
+
+def _publish_artifacts(generation, chunks_file, embeddings_file, manifest_file):
+    """Copy one generation's artifacts into an immutable directory; returns their paths."""
+    generations_dir = os.path.join(os.path.dirname(manifest_file) or ".", "generations")
+    gen_dir = os.path.join(generations_dir, f"gen-{generation}")
+    tmp_dir = gen_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    shutil.copy2(chunks_file, os.path.join(tmp_dir, "chunks.json"))
+    shutil.copy2(embeddings_file, os.path.join(tmp_dir, "embeddings.npy"))
+    shutil.rmtree(gen_dir, ignore_errors=True)  # left over from a run whose manifest write failed
+    os.rename(tmp_dir, gen_dir)
+
+    old = sorted((int(name[len("gen-"):]) for name in os.listdir(generations_dir)
+                  if name.startswith("gen-") and name[len("gen-"):].isdigit()), reverse=True)
+    for stale in old[KEEP_GENERATIONS:]:
+        shutil.rmtree(os.path.join(generations_dir, f"gen-{stale}"), ignore_errors=True)
+    return {"chunks_file": os.path.join(gen_dir, "chunks.json"),
+            "embeddings_file": os.path.join(gen_dir, "embeddings.npy")}
+
+
+def bump_manifest(chunks_file, embeddings_file, count, config=None, manifest_file=MANIFEST_FILE):
+    """Publish a new ingestion generation. Written atomically, after the artifacts themselves."""
+    previous = read_manifest(manifest_file) or {}
+    generation = previous.get("generation", 0) + 1
+    manifest = {
+        "generation": generation,
+        # where prepare_data keeps the artifacts (rewritten by the next ingestion)
+        "chunks_file": chunks_file,
+        "embeddings_file": embeddings_file,
+        # this generation's immutable copies, what ReloadableIndex loads
+        "artifacts": _publish_artifacts(generation, chunks_file, embeddings_file, manifest_file),
+        "count": count,
+        # ingestion config the artifacts were built with (chunk_size, chunk_overlap, dedup)
+        "config": config if config is not None else previous.get("config"),
+        "created_at": time.time(),
+    }
+    tmp_file = manifest_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
+    return manifest
+
+
+class ReloadableIndex:
+    """Pinecone-style index facade over the current LocalIndex generation."""
+
+    def __init__(self, manifest_file=MANIFEST_FILE, poll_interval: float = 5.0, namespace: str = "rag-proj"):
+        self.manifest_file = manifest_file
+        self.poll_interval = poll_interval
+        self.namespace = namespace
+        self.generation = 0
+        self._index = None
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self._failed_generation = None  # reported once, not on every poll
+        if not self.reload():
+            # No manifest yet: serve whatever prepare_data left in saved/
+            self._index = LocalIndex.from_saved(namespace=namespace)
+
+    def reload(self) -> bool:
+        """Load a newer generation if the manifest has one. Returns True if swapped."""
+        manifest = read_manifest(self.manifest_file)
+        if not manifest or manifest["generation"] <= self.generation:
+            return False
+        # Manifests written before per-generation copies only name the live files
+        artifacts = manifest.get("artifacts") or manifest
+        try:
+            new_index = LocalIndex.from_saved(artifacts["chunks_file"], artifacts["embeddings_file"],
+                                              namespace=self.namespace)
+        except Exception as e:  # truncated .npy (EOFError), bad JSON, pruned generation, ...
+            if self._failed_generation != manifest["generation"]:
+                self._failed_generation = manifest["generation"]
+                print(f"⚠️  Reload of generation {manifest['generation']} failed, keeping {self.generation}: {e}")
+            return False
+        count = new_index.describe_index_stats()["total_vector_count"]
+        if count != manifest.get("count", count):
+            return False  # artifacts being rewritten by a newer ingestion; retry next poll
+
+        self._index, old_generation = new_index, self.generation  # atomic swap
+        self.generation = manifest["generation"]
+        print(f"🔄 Search index swapped: generation {old_generation} → {self.generation} ({count} vectors)")
+        return True
+
+    def start(self):
+        """Start the background watcher thread."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                # One bad poll must not end hot reload for the life of the process
+                print(f"⚠️  Hot reload poll failed, retrying in {self.poll_interval}s: {e}")
+
+    def query(self, *args, **kwargs):
+        # Take the reference once: this query stays on one generation even if a swap lands mid-call
+        index = self._index
+        return index.query(*args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        return self._index.upsert(*args, **kwargs)
+
+    def describe_index_stats(self):
+        stats = self._index.describe_index_stats()
+        stats["generation"] = self.generation
+        return stats
@@ -11,8 +11,11 @@ def save_chunks_to_json(documents: List[Document], file_path: str):
         {"page_content": doc.page_content, "metadata": doc.metadata}
         for doc in documents
     ]
-    with open(file_path, "w", encoding="utf-8") as f:
+    # Write then rename, so readers never see a half-written file
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(json_docs, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, file_path)
 
 
 def load_chunks_from_json(file_path: str) -> List[Document]:
@@ -27,7 +30,10 @@ def load_chunks_from_json(file_path: str) -> List[Document]:
 
 
 def save_embeddings(arr, path):
-    np.save(path, arr)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:  # file object: np.save would append .npy to the name
+        np.save(f, arr)
+    os.replace(tmp_path, path)
 
 def load_embeddings(path):
     return np.load(path)
\ No newline at end of file
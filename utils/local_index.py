@@ -0,0 +1,120 @@
+"""
+In-memory vector index with the subset of the Pinecone Index API the project uses
+(upsert / query / describe_index_stats). Handy for offline runs, load tests and
+benchmarks where a real Pinecone index is unavailable or too slow to rebuild.
+"""
+
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.io import load_chunks_from_json, load_embeddings
+
+
+class Match:
+    """Mirrors the fields of a Pinecone query match."""
+
+    def __init__(self, id: str, score: float, metadata: Dict, values: List[float] = None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+        self.values = values or []
+
+    def __repr__(self):
+        return f"Match(id={self.id!r}, score={self.score:.4f})"
+
+
+class QueryResult:
+    def __init__(self, matches: List[Match]):
+        self.matches = matches
+
+
+class LocalIndex:
+    """Brute-force cosine-similarity index, one matrix per namespace."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency  # simulated network round trip, seconds
+        self._namespaces = {}
+
+    @classmethod
+    def from_saved(cls, chunks_file="saved/chunks.json", embeddings_file="saved/embeddings.npy",
+                   namespace="rag-proj", latency: float = 0.0):
+        """Build an index from the artifacts written by prepare_data (IDs match generate_embeddings)."""
+        chunks = load_chunks_from_json(chunks_file)
+        embeddings = load_embeddings(embeddings_file)
+        index = cls(latency=latency)
+        index.upsert(vectors=[
+            {
+                "id": f"doc-{i}",
+                "values": e,
+                "metadata": {
+                    "text": chunk.page_content,
+                    "source": chunk.metadata.get("source", "unknown"),
+                    "sources": chunk.metadata.get("sources", [chunk.metadata.get("source", "unknown")]),
+                },
+            }
+            for i, (chunk, e) in enumerate(zip(chunks, embeddings))
+        ], namespace=namespace)
+        return index
+
+    def upsert(self, vectors: List[Dict], namespace: str = ""):
+        ns = self._namespaces.setdefault(namespace, {"ids": [], "matrix": None, "metadata": [], "pos": {}})
+        new_rows = []
+        # Like Pinecone, a repeated ID within one batch resolves to its last write
+        for v in {v["id"]: v for v in vectors}.values():
+            values = np.asarray(v["values"], dtype=np.float32)
+            values = values / (np.linalg.norm(values) or 1.0)
+            if v["id"] in ns["pos"]:
+                row = ns["pos"][v["id"]]
+                ns["matrix"][row] = values
+                ns["metadata"][row] = v.get("metadata", {})
+                continue
+            ns["pos"][v["id"]] = len(ns["ids"]) + len(new_rows)
+            new_rows.append((v["id"], values, v.get("metadata", {})))
+        if new_rows:
+            ids, rows, metadata = zip(*new_rows)
+            block = np.vstack(rows)
+            ns["matrix"] = block if ns["matrix"] is None else np.vstack([ns["matrix"], block])
+            ns["ids"].extend(ids)
+            ns["metadata"].extend(metadata)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k: int = 3, include_metadata: bool = True, namespace: str = "",
+              include_values: bool = False):
+        if self.latency:
+            time.sleep(self.latency)
+        ns = self._namespaces.get(namespace)
+        if ns is None or ns["matrix"] is None:
+            return QueryResult([])
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1.0)
+        scores = ns["matrix"] @ q
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return QueryResult([
+            Match(ns["ids"][i], float(scores[i]), ns["metadata"][i] if include_metadata else {},
+                  ns["matrix"][i].tolist() if include_values else None)
+            for i in top
+        ])
+
+    def delete(self, ids: List[str] = None, delete_all: bool = False, namespace: str = ""):
+        if delete_all:
+            self._namespaces.pop(namespace, None)
+            return {}
+        ns = self._namespaces.get(namespace)
+        if ns is None or not ids:
+            return {}
+        keep = [i for i, vid in enumerate(ns["ids"]) if vid not in set(ids)]
+        ns["ids"] = [ns["ids"][i] for i in keep]
+        ns["metadata"] = [ns["metadata"][i] for i in keep]
+        ns["matrix"] = ns["matrix"][keep] if keep else None
+        ns["pos"] = {vid: i for i, vid in enumerate(ns["ids"])}
+        return {}
+
+    def describe_index_stats(self):
+        return {
+            "namespaces": {name: {"vector_count": len(ns["ids"])} for name, ns in self._namespaces.items()},
+            "total_vector_count": sum(len(ns["ids"]) for ns in self._namespaces.values()),
+        }
@@ -0,0 +1,238 @@
+"""
+On-demand profiling for the RAG query path.
+
+Profiling is off by default and costs one stat() per call when idle. Turn it on with:
+- RAG_PROFILE=1                 profile every wrapped call
+- RAG_PROFILE_UNTIL=<unix time> profile every wrapped call until that time
+- the trigger file (RAG_PROFILE_TRIGGER, default saved/profile.trigger) containing
+  a number of seconds - lets a running process be profiled without a restart
+- enable_profiling(seconds) from code, e.g. an admin endpoint
+
+Each profiled call writes to RAG_PROFILE_DIR (default saved/profiles):
+- <label>-<timestamp>-<pid>-<n>.collapsed  sampled stacks, feed to flamegraph.pl or speedscope
+- <label>-<timestamp>-<pid>-<n>-top.txt    stage timings + top-N cProfile functions
+"""
+
+import cProfile
+import functools
+import io
+import itertools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+_profile_until = 0.0
+_local = threading.local()
+_profile_counter = itertools.count()
+# cProfile allows one active profiler per process (enforced from Python 3.12)
+_cprofile_lock = threading.Lock()
+
+
+# Settings are read at call time, so values loaded from .env after import still apply
+def _profile_dir() -> str:
+    return os.environ.get("RAG_PROFILE_DIR", "saved/profiles")
+
+
+def _trigger_file() -> str:
+    return os.environ.get("RAG_PROFILE_TRIGGER", "saved/profile.trigger")
+
+
+def _sample_interval() -> float:
+    return float(os.environ.get("RAG_PROFILE_INTERVAL", "0.005"))
+
+
+def _top_n() -> int:
+    return int(os.environ.get("RAG_PROFILE_TOP", "25"))
+
+
+def enable_profiling(seconds: float):
+    """Profile every wrapped call for the next `seconds` seconds."""
+    global _profile_until
+    _profile_until = time.time() + seconds
+
+
+def disable_profiling():
+    global _profile_until
+    _profile_until = 0.0
+
+
+def _consume_trigger_file():
+    """Pick up a profiling window requested through the trigger file."""
+    trigger_file = _trigger_file()
+    if not os.path.exists(trigger_file):
+        return
+    try:
+        with open(trigger_file, "r") as f:
+            seconds = float(f.read().strip() or 60)
+    except (OSError, ValueError):
+        seconds = 60
+    finally:
+        # Always consume the trigger, or a bad file would re-arm profiling on every call
+        try:
+            os.remove(trigger_file)
+        except OSError:
+            pass
+    enable_profiling(seconds)
+    print(f"🔬 Profiling enabled for {seconds:.0f}s (trigger file)")
+
+
+def profiling_active() -> bool:
+    _consume_trigger_file()
+    if os.environ.get("RAG_PROFILE") == "1":
+        return True
+    env_until = float(os.environ.get("RAG_PROFILE_UNTIL", "0") or 0)
+    return time.time() < max(_profile_until, env_until)
+
+
+class _StackSampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _start_cprofile():
+    """Take the process-wide cProfile slot, or return None if another thread or tool holds it."""
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # e.g. a debugger or coverage run owns sys.monitoring
+        _cprofile_lock.release()
+        return None
+    return profiler
+
+
+@contextmanager
+def profiled(label: str):
+    """
+    Profile the enclosed block if profiling is active. Nested blocks join the outer session.
+    One thread at a time gets cProfile; concurrent calls are profiled by stack sampling only.
+    Profiler failures are reported, never raised into the profiled call.
+    """
+    if getattr(_local, "session", None) is not None or not profiling_active():
+        yield
+        return
+
+    session = {"label": label, "stages": Counter()}
+    sampler = _StackSampler(threading.get_ident(), _sample_interval())
+    start = time.perf_counter()
+    try:
+        sampler.start()
+    except RuntimeError as e:  # can't start new thread
+        print(f"⚠️  Profiling skipped for {label}: {e}")
+        yield
+        return
+    profiler = _start_cprofile()
+    _local.session = session
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+        sampler.stop()
+        _local.session = None
+        try:
+            _write_profile(session, sampler.stacks, profiler, time.perf_counter() - start)
+        except OSError as e:
+            print(f"⚠️  Could not write profile for {label}: {e}")
+
+
+@contextmanager
+def stage(name: str):
+    """Record wall time of a named pipeline stage in the active profile session and timing collector."""
+    session = getattr(_local, "session", None)
+    timings = getattr(_local, "timings", None)
+    if session is None and timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if session is not None:
+            session["stages"][name] += elapsed
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed * 1000
+
+
+@contextmanager
+def collect_stage_timings():
+    """Collect per-stage wall times (ms) for the enclosed block, whether or not profiling is on."""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        yield timings
+        return
+    _local.timings = timings = {}
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+
+
+def profile(label: str):
+    """Decorator form of `profiled`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiled(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _write_profile(session, stacks, profiler, elapsed):
+    profile_dir = _profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    # pid + per-process counter keep concurrent / same-second profiles from overwriting each other
+    base = os.path.join(profile_dir, f"{session['label']}-{time.strftime('%Y%m%d-%H%M%S')}"
+                                     f"-{os.getpid()}-{next(_profile_counter)}")
+
+    with open(base + ".collapsed", "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    out = io.StringIO()
+    out.write(f"Profile: {session['label']}  total {elapsed * 1000:.1f} ms\n\n")
+    if session["stages"]:
+        out.write("Stage timings:\n")
+        for name, seconds in session["stages"].most_common():
+            out.write(f"  {name:<24} {seconds * 1000:10.1f} ms  {seconds / elapsed:6.1%}\n")
+        out.write("\n")
+    if profiler is None:
+        out.write("cProfile was busy with a concurrent call: see the .collapsed stacks for this one.\n")
+    else:
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(_top_n())
+        stats.sort_stats("tottime").print_stats(_top_n())
+    with open(base + "-top.txt", "w") as f:
+        f.write(out.getvalue())
+
+    print(f"🔬 Profile written to {base}.collapsed / {base}-top.txt")
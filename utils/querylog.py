@@ -0,0 +1,92 @@
+"""
+Structured query log for the RAG query path.
+
+Set RAG_QUERY_LOG=<path.jsonl> to append one JSON record per query:
+timestamp, query text, retrieved IDs/scores, context chunks used, stage timings (ms), cache hits
+and whether the LLM call succeeded.
+The file rotates at RAG_QUERY_LOG_MAX_BYTES (default 50MB), keeping
+RAG_QUERY_LOG_BACKUPS old files (default 5). Replay it with replay_queries.py.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Iterator, List
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _query_log_path() -> str:
+    # Read at call time: .env is loaded after this module is imported
+    return os.environ.get("RAG_QUERY_LOG", "")
+
+
+def _get_logger(path: str):
+    global _logger
+    if _logger is not None:
+        return _logger
+    with _logger_lock:
+        if _logger is not None:
+            return _logger
+        max_bytes = int(os.environ.get("RAG_QUERY_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+        backups = int(os.environ.get("RAG_QUERY_LOG_BACKUPS", "5"))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger = logging.getLogger("rag.querylog")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        _logger = logger  # publish only once fully configured
+    return _logger
+
+
+def log_query(query_text: str, matches, timings: Dict[str, float], cache_hits: Dict[str, bool], llm_ok: bool = True):
+    """Append one query record to the rotating JSONL log (no-op unless RAG_QUERY_LOG is set)."""
+    path = _query_log_path()
+    if not path:
+        return
+    record = {
+        "timestamp": time.time(),
+        "query": query_text,
+        "retrieved_ids": [m.id for m in matches],
+        "context_chunks": len(matches),
+        "scores": [round(float(m.score), 4) for m in matches],
+        "timings_ms": {name: round(ms, 2) for name, ms in timings.items()},
+        "cache_hits": cache_hits,
+        "llm_ok": llm_ok,
+    }
+    _get_logger(path).info(json.dumps(record, ensure_ascii=False))
+
+
+def read_query_log(path: str) -> List[Dict]:
+    """Load a captured query log, oldest first. Rotated backups (path.1, path.2, ...) are included."""
+    files = [path]
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+
+    records = []
+    for file in reversed(files):
+        records.extend(_iter_records(file))
+    records.sort(key=lambda r: r["timestamp"])
+    return records
+
+
+def _iter_records(path: str) -> Iterator[Dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written line at rotation/crash
@@ -0,0 +1,219 @@
+"""
+Portable vector snapshots: the embedding matrix, stable IDs, chunk text, metadata and
+the model/chunking config in one directory, so an index can be rebuilt without
+re-running extraction or re-encoding.
+
+Layout (columnar, one file per column):
+    manifest.json       format version, model/chunking config, count, dim, dtype
+    vectors.npy         (count, dim) float32/float16 matrix, memory-mapped on import
+    ids.npy             stable vector IDs
+    text.bin            UTF-8 chunk texts, concatenated
+    text_offsets.npy    (count + 1) byte offsets into text.bin
+    metadata.bin        UTF-8 JSON metadata per chunk, concatenated
+    metadata_offsets.npy
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List
+
+import numpy as np
+
+from utils.hot_reload import bump_manifest, read_manifest
+from utils.io import load_chunks_from_json, load_embeddings
+
+SNAPSHOT_VERSION = 1
+# Model used by utils/embedding.py (not imported here: that would load it)
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def ingestion_config(chunks_file: str, chunks, overrides: Dict = None) -> Dict:
+    """
+    The config the saved artifacts were really built with: saved/manifest.json if it
+    describes `chunks_file`, with `overrides` (e.g. CLI flags) on top. dedup is inferred
+    from metadata['sources'] when unknown; chunk size/overlap must come from somewhere.
+    """
+    manifest = read_manifest() or {}
+    config = {"model": EMBEDDING_MODEL}
+    if manifest.get("config") and manifest.get("chunks_file") == chunks_file:
+        config.update(manifest["config"])
+    config.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    config.setdefault("dedup", all("sources" in c.metadata for c in chunks))
+    missing = [k for k in ("chunk_size", "chunk_overlap") if k not in config]
+    if missing:
+        raise ValueError(f"Ingestion config unknown for {chunks_file} ({', '.join(missing)}): "
+                         f"no manifest entry, pass them explicitly")
+    return config
+
+
+def _write_column(path_prefix: str, values: List[str]):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    with open(path_prefix + ".bin", "wb") as f:
+        for b in encoded:
+            f.write(b)
+    np.save(path_prefix + "_offsets.npy", offsets)
+
+
+class _Column:
+    """Lazily decoded string column backed by a memory-mapped blob."""
+
+    def __init__(self, path_prefix: str):
+        self.offsets = np.load(path_prefix + "_offsets.npy")
+        self.blob = np.memmap(path_prefix + ".bin", dtype=np.uint8, mode="r") if self.offsets[-1] else b""
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+def export_snapshot(out_dir: str, chunks_file="saved/chunks.json", embeddings_file="saved/embeddings.npy",
+                    config: Dict = None, dtype: str = "float32") -> Dict:
+    """Write a snapshot of the saved chunks/embeddings. IDs match generate_embeddings (doc-<i>)."""
+    chunks = load_chunks_from_json(chunks_file)
+    embeddings = np.asarray(load_embeddings(embeddings_file), dtype=dtype)
+    if len(chunks) != len(embeddings):
+        raise ValueError(f"{len(chunks)} chunks but {len(embeddings)} embeddings - re-run prepare_data")
+    config = ingestion_config(chunks_file, chunks, config)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "vectors.npy"), embeddings)
+    np.save(os.path.join(out_dir, "ids.npy"), np.array([f"doc-{i}" for i in range(len(chunks))]))
+    _write_column(os.path.join(out_dir, "text"), [c.page_content for c in chunks])
+    _write_column(os.path.join(out_dir, "metadata"), [json.dumps(c.metadata, ensure_ascii=False) for c in chunks])
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "config": config,
+        "count": len(chunks),
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "dtype": dtype,
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📦 Exported {manifest['count']} vectors (dim {manifest['dim']}, {dtype}) to {out_dir}")
+    return manifest
+
+
+class Snapshot:
+    """Read side of a snapshot directory. Vectors are memory-mapped, so import streams from disk."""
+
+    def __init__(self, snapshot_dir: str):
+        self.dir = snapshot_dir
+        with open(os.path.join(snapshot_dir, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.manifest.get('version')}")
+        self.vectors = np.load(os.path.join(snapshot_dir, "vectors.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(snapshot_dir, "ids.npy"))
+        self.text = _Column(os.path.join(snapshot_dir, "text"))
+        self.metadata = _Column(os.path.join(snapshot_dir, "metadata"))
+
+    def __len__(self):
+        return self.manifest["count"]
+
+    def chunk_metadata(self, i: int) -> Dict:
+        return json.loads(self.metadata[i])
+
+    def batch(self, start: int, end: int) -> List[Dict]:
+        """Pinecone-style upsert payload for rows [start, end)."""
+        values = np.asarray(self.vectors[start:end], dtype=np.float32)
+        payload = []
+        for row, i in enumerate(range(start, end)):
+            metadata = self.chunk_metadata(i)
+            source = metadata.get("source", "unknown")
+            payload.append({
+                "id": str(self.ids[i]),
+                "values": values[row].tolist(),
+                "metadata": {
+                    "text": self.text[i],
+                    "source": source,
+                    "sources": metadata.get("sources", [source]),
+                },
+            })
+        return payload
+
+    def restore_saved(self, chunks_file="saved/chunks.json", embeddings_file="saved/embeddings.npy"):
+        """Rewrite the local prepare_data artifacts from the snapshot and publish them as a new generation."""
+        from langchain.schema import Document
+        from utils.io import save_chunks_to_json, save_embeddings
+        chunks = [Document(page_content=self.text[i], metadata=self.chunk_metadata(i)) for i in range(len(self))]
+        save_chunks_to_json(chunks, chunks_file)
+        save_embeddings(np.asarray(self.vectors, dtype=np.float32), embeddings_file)
+        # Hot-reloading query processes pick this up; prepare_data sees a matching config
+        config = {k: v for k, v in self.manifest["config"].items() if k != "model"}
+        manifest = bump_manifest(chunks_file, embeddings_file, len(chunks), config=config)
+        print(f"💾 Restored {len(chunks)} chunks to {chunks_file} and {embeddings_file} "
+              f"(generation {manifest['generation']})")
+
+
+def import_snapshot(snapshot: Snapshot, index, namespace: str = "rag-proj", batch_size: int = 100,
+                    workers: int = 4, progress_file: str = None, replace: bool = True) -> int:
+    """
+    Upsert a snapshot into any index with a Pinecone-style upsert(vectors, namespace).
+    Batches run on `workers` threads with at most 2x workers in flight. Finished batch
+    numbers are appended to `progress_file` (after a batch-size header line), so a rerun
+    with the same batch size resumes where it stopped; a different size is refused.
+    With `replace`, a fresh (non-resumed) import first clears the namespace, so vectors
+    of a larger previous ingestion don't outlive the restore.
+    """
+    done = set()
+    if progress_file and os.path.exists(progress_file):
+        with open(progress_file, "r") as f:
+            lines = [line for line in f if line.strip()]
+        # First line records the batch size: batch numbers mean nothing under another size
+        header = json.loads(lines[0]) if lines else {"batch_size": batch_size}
+        recorded = header.get("batch_size") if isinstance(header, dict) else None
+        if recorded != batch_size:
+            raise ValueError(f"{progress_file} was written with batch size {recorded}, not {batch_size}; "
+                             f"resume with --batch-size {recorded} or start over with --restart")
+        done = {int(line) for line in lines[1:]}
+
+    total = len(snapshot)
+    batches = [b for b in range((total + batch_size - 1) // batch_size) if b not in done]
+    if done:
+        print(f"⏩ Resuming: {len(done)} batches already imported")
+    elif replace:
+        try:
+            index.delete(delete_all=True, namespace=namespace)
+        except Exception as e:
+            # Pinecone raises if the namespace does not exist yet
+            print(f"ℹ️  Namespace '{namespace}' not cleared: {e}")
+
+    lock = threading.Lock()
+    progress = open(progress_file, "a") if progress_file else None
+    if progress and progress.tell() == 0:
+        progress.write(json.dumps({"batch_size": batch_size}) + "\n")
+        progress.flush()
+
+    def upsert_batch(b):
+        start = b * batch_size
+        index.upsert(vectors=snapshot.batch(start, min(start + batch_size, total)), namespace=namespace)
+        if progress:
+            with lock:
+                progress.write(f"{b}\n")
+                progress.flush()
+        return b
+
+    imported = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            for b in batches:
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        future.result()
+                        imported += 1
+                in_flight.add(pool.submit(upsert_batch, b))
+            for future in in_flight:
+                future.result()
+                imported += 1
+    finally:
+        if progress:
+            progress.close()
+
+    print(f"📥 Imported {imported} batches ({total} vectors total) into namespace '{namespace}'")
+    return imported
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Export / import portable vector snapshots (see utils/snapshot.py).
+
+Usage:
+    python vector_snapshot.py export saved/snapshots/v1
+    python vector_snapshot.py import saved/snapshots/v1 --index-name ragproj-v2 --workers 8
+    python vector_snapshot.py import saved/snapshots/v1 --restore-saved --restore-only
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+from utils.snapshot import Snapshot, export_snapshot, import_snapshot
+
+load_dotenv()
+
+
+def connect_pinecone(index_name: str, dim: int):
+    from pinecone import Pinecone, ServerlessSpec, CloudProvider, AwsRegion, VectorType
+    pc = Pinecone(os.environ.get("PINECONE_API_KEY"))
+    if not pc.has_index(index_name):
+        pc.create_index(
+            name=index_name,
+            dimension=dim,
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud=CloudProvider.AWS,
+                region=AwsRegion.US_EAST_1
+            ),
+            vector_type=VectorType.DENSE
+        )
+    return pc.Index(index_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector snapshot export/import")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="snapshot saved/chunks.json + saved/embeddings.npy")
+    exp.add_argument("out_dir")
+    exp.add_argument("--chunks", default="saved/chunks.json")
+    exp.add_argument("--embeddings", default="saved/embeddings.npy")
+    exp.add_argument("--float16", action="store_true", help="halve snapshot size (vectors upcast on import)")
+    exp.add_argument("--chunk-size", type=int, default=None,
+                     help="ingestion chunk size, if saved/manifest.json does not record it")
+    exp.add_argument("--chunk-overlap", type=int, default=None,
+                     help="ingestion chunk overlap, if saved/manifest.json does not record it")
+
+    imp = sub.add_parser("import", help="stream a snapshot into an index")
+    imp.add_argument("snapshot_dir")
+    imp.add_argument("--index-name", default="ragproj-v1")
+    imp.add_argument("--namespace", default="rag-proj")
+    imp.add_argument("--batch-size", type=int, default=100)
+    imp.add_argument("--workers", type=int, default=4)
+    imp.add_argument("--restart", action="store_true", help="ignore previous progress: clear the namespace and import everything")
+    imp.add_argument("--restore-saved", action="store_true",
+                     help="also rewrite saved/chunks.json + embeddings.npy and bump saved/manifest.json")
+    imp.add_argument("--restore-only", action="store_true", help="with --restore-saved, skip the Pinecone import")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        config = {"chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap}
+        export_snapshot(args.out_dir, args.chunks, args.embeddings, config=config,
+                        dtype="float16" if args.float16 else "float32")
+        return
+
+    if args.restore_only and not args.restore_saved:
+        parser.error("--restore-only requires --restore-saved")
+
+    snapshot = Snapshot(args.snapshot_dir)
+    print(f"📦 Snapshot: {len(snapshot)} vectors, config {snapshot.manifest['config']}")
+    if args.restore_saved:
+        snapshot.restore_saved()
+    if args.restore_only:
+        return
+
+    index = connect_pinecone(args.index_name, snapshot.manifest["dim"])
+    progress_file = os.path.join(args.snapshot_dir, f"import-{args.index_name}-{args.namespace}.progress")
+    if args.restart and os.path.exists(progress_file):
+        os.remove(progress_file)
+
+    import_snapshot(snapshot, index, args.namespace, args.batch_size, args.workers, progress_file)
+
+
+if __name__ == "__main__":
+    main()